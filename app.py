@@ -4,11 +4,18 @@ import dotenv
 import asyncio
 import os
 from src.agent import process_query
-from src.permissions import get_permit_users, update_user_role
+from src.agent_functions import warm_up
+from src.permissions import get_permit, get_permit_users, update_user_role
 from src.constants import USERS
 
 dotenv.load_dotenv()
 
+# With `gunicorn --preload` this runs once in the master and the warmed
+# modules and clients are shared with every forked worker
+if os.environ.get('PRELOAD_APP') == '1':
+    warm_up()
+    get_permit()
+
 app = Flask(__name__)
 CORS(app)
 
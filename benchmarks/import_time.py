@@ -0,0 +1,71 @@
+"""
+Measure worker cold-start cost: wall time to import the app and the
+cumulative import time of every module it pulls in.
+
+Usage:
+    python benchmarks/import_time.py [--target app] [--top 20] [--preload] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(target, preload=False):
+    env = dict(os.environ)
+    if preload:
+        env["PRELOAD_APP"] = "1"
+    else:
+        env.pop("PRELOAD_APP", None)
+
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{proc.stderr[-2000:]}")
+
+    # Lines look like "import time:  self [us] | cumulative | imported package"
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative) / 1e6
+
+    return wall, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", default="app", help="module to import")
+    parser.add_argument("--top", type=int, default=20, help="modules to list")
+    parser.add_argument("--preload", action="store_true", help="set PRELOAD_APP=1")
+    parser.add_argument("--json", action="store_true", help="print JSON for tracking")
+    args = parser.parse_args()
+
+    wall, modules = measure(args.target, args.preload)
+    ranked = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]
+
+    if args.json:
+        print(json.dumps({
+            "target": args.target,
+            "preload": args.preload,
+            "wall_seconds": round(wall, 4),
+            "modules": {name: round(seconds, 4) for name, seconds in ranked}
+        }, indent=2))
+        return
+
+    print(f"import {args.target}: {wall * 1000:.1f} ms wall (interpreter start included)")
+    for name, seconds in ranked:
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
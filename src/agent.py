@@ -1,3 +1,5 @@
+import re
+from functools import partial
 from typing import Dict, Any
 from src.agent_functions import (
     fetch_onboarding_data,
@@ -7,29 +9,53 @@ from src.agent_functions import (
     create_image
 )
 from src.permissions import check_action_permission
+from src.constants import PERMISSION_TYPES, EXTRACTIVE_MAX_POINTS
+from src.resilience import is_outage, request_deadline
+from src.singleflight import SingleFlight, query_key
 
+# Concurrent identical read-only requests share one handler run
+action_flight = SingleFlight()
 
-def analyze_and_summarize_content(content_lines, query):
-    """Analyze content and provide a natural, organized summary"""
-    # Identify main topics from the content
-    topics = {}
-    current_topic = "General"
-    
+
+def _rank_points(points, query_terms, max_points):
+    """Keep the points sharing the most terms with the query, in original order"""
+    if len(points) <= max_points:
+        return points
+    scored = sorted(
+        range(len(points)),
+        key=lambda i: len(query_terms.intersection(re.findall(r"\w+", points[i].lower()))),
+        reverse=True
+    )
+    keep = sorted(scored[:max_points])
+    return [points[i] for i in keep]
+
+def _group_topics(content_lines, topics, topic="General"):
+    """Add each line to `topics` under the most recent section header, starting from `topic`"""
+    # Single pass; dicts keep the first-seen order and drop duplicate points
+    # without a rescan
+    current = topics.setdefault(topic, {})
     for line in content_lines:
+        line = line.strip()
+        if not line:
+            continue
         # Check if line is a section header
-        if line.isupper() or (len(line) > 0 and line[0].isdigit() and '.' in line):
-            current_topic = line
-            topics[current_topic] = []
+        if line.isupper() or (line[0].isdigit() and '.' in line):
+            current = topics.setdefault(line, {})
         else:
-            if current_topic not in topics:
-                topics[current_topic] = []
-            topics[current_topic].append(line)
-    
+            current[line] = None
+    return topics
+
+def analyze_and_summarize_content(content_lines, query, max_points=EXTRACTIVE_MAX_POINTS):
+    """Analyze content and provide a natural, organized summary"""
+    return _summarize_topics(_group_topics(content_lines, {}), query, max_points)
+
+def _summarize_topics(topics, query, max_points):
     # Generate a natural response based on the query and content
     response_parts = [
         f"Let me help you understand {query.lower().strip('?.')}.",
         ""
     ]
+    query_terms = set(re.findall(r"\w+", query.lower()))
     
     # Analyze the content and provide a summary
     main_points = []
@@ -37,20 +63,20 @@ def analyze_and_summarize_content(content_lines, query):
     
     for topic, points in topics.items():
         if points:  # Only process non-empty topics
-            # Clean up points and remove duplicates
-            unique_points = list(set([p.strip() for p in points if p.strip()]))
+            unique_points = list(points)
             
             # Identify if this is a main point or detail
-            if len(unique_points) <= 2 or any(keyword in topic.lower() for keyword in ['overview', 'summary', 'introduction']):
+            topic_lower = topic.lower()
+            if len(unique_points) <= 2 or any(keyword in topic_lower for keyword in ['overview', 'summary', 'introduction']):
                 main_points.extend(unique_points)
             else:
-                details[topic] = unique_points
+                details[topic] = _rank_points(unique_points, query_terms, max_points)
     
     # Add main points if any
     if main_points:
         response_parts.extend([
             "Here are the key points:",
-            *[f"• {point}" for point in main_points],
+            *[f"• {point}" for point in _rank_points(main_points, query_terms, max_points)],
             ""
         ])
     
@@ -66,7 +92,7 @@ def analyze_and_summarize_content(content_lines, query):
             ])
     
     # Add a summary of important procedures or notes if present
-    procedures = [p for topic, points in details.items() for p in points if 'procedure' in p.lower() or 'submit' in p.lower()]
+    procedures = [p for points in details.values() for p in points if 'procedure' in p.lower() or 'submit' in p.lower()]
     if procedures:
         response_parts.extend([
             "## Important Procedures",
@@ -76,6 +102,15 @@ def analyze_and_summarize_content(content_lines, query):
     
     return "\n".join(response_parts)
 
+def extractive_onboarding_answer(query, results):
+    """Summarize retrieved onboarding chunks locally, without the LLM"""
+    # Each chunk starts under its own section, so untitled 'General' chunks
+    # don't inherit the heading of the chunk before them
+    topics = {}
+    for result in results:
+        _group_topics(result['content'].splitlines(), topics, result['section'])
+    return _summarize_topics(topics, query, EXTRACTIVE_MAX_POINTS)
+
 def format_onboarding_response(result):
     """Format onboarding query results into a user-friendly response"""
     return result.get('error', f"I apologize, but I encountered an error while searching the onboarding documents: {result['error']}") if 'error' in result else result['response']
@@ -119,8 +154,22 @@ def format_repo_query_response(result):
     return f"I apologize, but I encountered an error while querying the repository: {result['error']}" if 'error' in result else f"Here's what I found in the codebase:\n{result['data']}"
 
 async def process_query(user_id: str, query: str) -> Dict[str, Any]:
-    """Process a user query after checking permissions"""
-    action_type = classify_action_with_ai(query)
+    """Process a user query after checking permissions, within the request deadline"""
+    with request_deadline():
+        return await _process_query(user_id, query)
+
+async def _process_query(user_id: str, query: str) -> Dict[str, Any]:
+    try:
+        action_type = classify_action_with_ai(query)
+    except Exception as e:
+        if not is_outage(e):
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+        # An unreachable model gets the same default as an unrecognised label,
+        # so the question can still be answered extractively
+        action_type = "onboarding_query"
     
     # Check permissions
     has_permission, reason = await check_action_permission(user_id, action_type)
@@ -133,7 +182,11 @@ async def process_query(user_id: str, query: str) -> Dict[str, Any]:
     
     try:
         action_handlers = {
-            "onboarding_query": (fetch_onboarding_data, format_onboarding_response, "text"),
+            "onboarding_query": (
+                partial(fetch_onboarding_data, fallback=extractive_onboarding_answer),
+                format_onboarding_response,
+                "text"
+            ),
             "github_issues": (create_github_issue, format_github_issue_response, "text"),
             "code_query": (get_repo_context, format_repo_query_response, "text"),
             "create_image": (create_image, format_image_gen_response, "image")
@@ -147,9 +200,20 @@ async def process_query(user_id: str, query: str) -> Dict[str, Any]:
             
         handler_func, formatter_func, response_type = action_handlers[action_type]
         
+        # Only read-only actions are coalesced; creates must run per request.
+        # Denied requests returned above, and read-only results don't depend
+        # on who asked, so every request that gets here can share a flight.
+        flight_key = (action_type, query_key(query))
+        coalesce = PERMISSION_TYPES[action_type]["action"] == "read"
+
         # Handle async functions
         if action_type == "code_query":
-            result = await handler_func(query)
+            if coalesce:
+                result = await action_flight.do_async(flight_key, handler_func, query)
+            else:
+                result = await handler_func(query)
+        elif coalesce:
+            result = action_flight.do(flight_key, handler_func, query)
         else:
             result = handler_func(query)
             
@@ -159,7 +223,8 @@ async def process_query(user_id: str, query: str) -> Dict[str, Any]:
             "status": "success",
             "action_type": action_type,
             "response_type": response_type,
-            "response": formatted_response
+            "response": formatted_response,
+            "extractive": bool(result.get("extractive")) if isinstance(result, dict) else False
         }
         
     except Exception as e:
@@ -1,24 +1,48 @@
-import requests
-import openai
-from pinecone import Pinecone
-from langchain_openai import OpenAIEmbeddings
 from base64 import b64decode
+from functools import lru_cache
 from src.constants import (
-    OPENAI_API_KEY, PINECONE_API_KEY, GITHUB_API_KEY,
-    GITHUB_API_REPO_URL, GITHUB_REPO_URL
+    OPENAI_API_KEY, PINECONE_API_KEY, GITHUB_API_KEY, OPENAI_TIMEOUT_SECONDS,
+    GITHUB_API_REPO_URL, GITHUB_REPO_URL, GENERATION_BUDGET_SECONDS,
+    GENERATION_LATENCY_PERCENTILE, EMBEDDING_CACHE_TTL, REPO_CACHE_TTL,
+    ANSWER_CACHE_TTL, HYBRID_CANDIDATES
 )
+from src.cache import get_cache, make_key
+from src.lazy import lazy_import
+from src.retrieval import hybrid_search, get_onboarding_index
+from src.singleflight import SingleFlight, query_key
+from src.resilience import (
+    openai_upstream, github_upstream, pinecone_upstream, LatencyTracker, remaining
+)
+
+# Heavy SDKs are imported on first use to keep worker start-up fast
+requests = lazy_import("requests")
+# No SDK-level retries: each retry would get a fresh timeout and overrun the
+# request deadline, so retrying is left to the deadline and hedging layer
+openai = lazy_import("openai", on_load=lambda module: setattr(module, "max_retries", 0))
+pinecone = lazy_import("pinecone")
+langchain_openai = lazy_import("langchain_openai")
+
+# Shared by concurrent requests in this worker for identical classifications
+classify_flight = SingleFlight()
+
+# Per-operation latency, so slow generations don't set the embedding hedge
+# threshold (and fast embeddings don't skew the generation estimate)
+generation_latency = LatencyTracker()
+embedding_latency = LatencyTracker()
 
 def callApi(method, url, data, api_key):
-    return requests.request(
+    return github_upstream.call(lambda timeout: requests.request(
         method=method,
         url=url,
         headers={
             "Content-Type": "application/json",
             "Authorization": f"Bearer {api_key}"
         },
-        json=data
-    )
+        json=data,
+        timeout=timeout
+    ))
 
+@lru_cache(maxsize=1)
 def initialize_clients():
     if not PINECONE_API_KEY:
         raise ValueError("PINECONE_API_KEY environment variable is not set")
@@ -26,10 +50,25 @@ def initialize_clients():
         raise ValueError("OPENAI_API_KEY environment variable is not set")
         
     openai.api_key = OPENAI_API_KEY
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    embeddings = OpenAIEmbeddings()
+    pc = pinecone.Pinecone(api_key=PINECONE_API_KEY)
+    embeddings = langchain_openai.OpenAIEmbeddings(
+        request_timeout=OPENAI_TIMEOUT_SECONDS, max_retries=0
+    )
     return pc, embeddings
 
+def warm_up():
+    """Import the SDKs and build the shared clients ahead of the first request"""
+    for module in (requests, openai, pinecone, langchain_openai):
+        module.load()
+    try:
+        initialize_clients()
+    except ValueError as e:
+        print(f"Skipping client warm-up: {str(e)}")
+    try:
+        get_onboarding_index()
+    except Exception as e:
+        print(f"Skipping lexical index warm-up: {str(e)}")
+
 def process_onboarding_response(query, results):
     context = "\n\n".join([
         f"Section: {result['section']}\n{result['content']}"
@@ -64,17 +103,28 @@ Example format:
 - Note 1
 - Note 2"""
 
-    response = openai.chat.completions.create(
+    response = openai_upstream.call(lambda timeout: openai.chat.completions.create(
         model="gpt-4-turbo-preview",
         messages=[
             {"role": "system", "content": "You are a direct and efficient policy information system. Provide clear, structured information without any fluff or unnecessary formalities."},
             {"role": "user", "content": prompt}
         ],
-        temperature=0.7
-    )
+        temperature=0.7,
+        timeout=timeout
+    ), latency=generation_latency)
     
     return response.choices[0].message.content
 
+def generation_fits_deadline():
+    """Whether an LLM answer can plausibly finish before the request deadline"""
+    if openai_upstream.breaker.state == "open":
+        return False
+    left = remaining()
+    if left is None:
+        return True
+    expected = generation_latency.percentile(GENERATION_LATENCY_PERCENTILE)
+    return left > (expected if expected is not None else GENERATION_BUDGET_SECONDS)
+
 def preprocess_github_issue(query):
     prompt = f"""Format this request into a proper GitHub issue. 
     Create a clear title, detailed description, and appropriate labels.
@@ -95,14 +145,15 @@ def preprocess_github_issue(query):
     5. Format the description with markdown if needed
     """
     
-    response = openai.chat.completions.create(
+    response = openai_upstream.call(lambda timeout: openai.chat.completions.create(
         model="gpt-4-turbo-preview",
         messages=[
             {"role": "system", "content": "You are a GitHub issue formatting assistant. Always respond with valid JSON."},
             {"role": "user", "content": prompt}
         ],
-        temperature=0.7
-    )
+        temperature=0.7,
+        timeout=timeout
+    ))
     
     try:
         response_text = response.choices[0].message.content
@@ -119,13 +170,14 @@ def preprocess_github_issue(query):
 
 def create_image(prompt, n=1, size="1024x1024"):
     try:
-        response = openai.images.generate(
+        response = openai_upstream.call(lambda timeout: openai.images.generate(
             model="dall-e-3",
             prompt=prompt,
             n=n,
             size=size,
-            response_format="b64_json"
-        )
+            response_format="b64_json",
+            timeout=timeout
+        ))
         
         return {
             "data": [{
@@ -150,33 +202,94 @@ def create_github_issue(query):
     response = callApi("POST", GITHUB_API_REPO_URL, data, GITHUB_API_KEY)
     return response.json()
 
-def fetch_onboarding_data(query, top_k=5):
+def fetch_vector_results(query, top_k):
+    cache = get_cache()
+    pc, embeddings = initialize_clients()
+    index = pc.Index("onboarding-index")
+    # Idempotent reads: hedged and bounded by the upstream timeouts. The
+    # embeddings client enforces OPENAI_TIMEOUT_SECONDS on its own, so an
+    # abandoned hedge doesn't hold a pool thread indefinitely
+    query_embedding = cache.get_or_compute(
+        make_key("embedding", query),
+        lambda: openai_upstream.call(
+            lambda timeout: embeddings.embed_query(query),
+            hedge=True,
+            latency=embedding_latency
+        ),
+        EMBEDDING_CACHE_TTL
+    )
+    
+    results = pinecone_upstream.call(lambda timeout: index.query(
+        vector=query_embedding,
+        top_k=top_k,
+        include_metadata=True,
+        _request_timeout=timeout
+    ), hedge=True)
+    
+    vector_results = []
+    for match in results['matches']:
+        vector_results.append({
+            'content': match.metadata['text'],
+            'section': f"{match.metadata['section_number']}. {match.metadata['section_title']}" if match.metadata.get('section_number') else 'General',
+            'relevance_score': match.score
+        })
+    return vector_results
+
+def fetch_onboarding_data(query, top_k=5, fallback=None):
+    """
+    Retrieve up to `top_k` onboarding chunks (hybrid lexical + vector) and
+    answer with the LLM. If `fallback` is given it is called as
+    `fallback(query, results)` to build an extractive answer when generation
+    would overrun the deadline or the model fails, and a failed vector
+    search falls back to lexical results.
+    """
     try:
-        pc, embeddings = initialize_clients()
-        index = pc.Index("onboarding-index")
-        query_embedding = embeddings.embed_query(query)
+        cache = get_cache()
+        answer_key = make_key("answer", "onboarding_query", query_key(query))
+        cached_answer = cache.get(answer_key)
+        if cached_answer is not None:
+            return cached_answer
+
+        vector_error = None
+        try:
+            vector_results = fetch_vector_results(query, max(top_k, HYBRID_CANDIDATES))
+        except Exception as e:
+            # With the model or Pinecone unavailable, answer from BM25 alone
+            if fallback is None:
+                raise
+            vector_error = e
+            vector_results = []
         
-        results = index.query(
-            vector=query_embedding,
-            top_k=top_k,
-            include_metadata=True
+        # Fuse with BM25 and keep only as many chunks as the scores justify
+        formatted_results = hybrid_search(
+            query, vector_results, max_k=top_k, candidates=HYBRID_CANDIDATES
         )
+        if not formatted_results and vector_error is not None:
+            raise vector_error
         
-        formatted_results = []
-        for match in results['matches']:
-            formatted_results.append({
-                'content': match.metadata['text'],
-                'section': f"{match.metadata['section_number']}. {match.metadata['section_title']}" if match.metadata.get('section_number') else 'General',
-                'relevance_score': match.score
-            })
+        extractive = False
+        if fallback is not None and not generation_fits_deadline():
+            processed_response = fallback(query, formatted_results)
+            extractive = True
+        else:
+            try:
+                processed_response = process_onboarding_response(query, formatted_results)
+            except Exception:
+                if fallback is None:
+                    raise
+                processed_response = fallback(query, formatted_results)
+                extractive = True
         
-        processed_response = process_onboarding_response(query, formatted_results)
-        
-        return {
+        result = {
             'query': query,
             'response': processed_response,
-            'source': 'Donut Naturales Onboarding Guide'
+            'source': 'Donut Naturales Onboarding Guide',
+            'extractive': extractive
         }
+        # Degraded answers are not cached so the next request retries in full
+        if not extractive and vector_error is None:
+            cache.set(answer_key, result, ANSWER_CACHE_TTL)
+        return result
         
     except Exception as e:
         return {
@@ -217,14 +330,15 @@ Format the response with appropriate sections like:
 ## Relevant Code Patterns
 - Notable patterns or practices used"""
 
-    response = openai.chat.completions.create(
+    response = openai_upstream.call(lambda timeout: openai.chat.completions.create(
         model="gpt-4-turbo-preview",
         messages=[
             {"role": "system", "content": "You are a technical documentation expert. Analyze codebases and provide clear, structured explanations."},
             {"role": "user", "content": prompt}
         ],
-        temperature=0.7
-    )
+        temperature=0.7,
+        timeout=timeout
+    ))
     
     return response.choices[0].message.content
 
@@ -239,16 +353,23 @@ async def get_repo_context(query):
         owner = parts[-2]
         repo = parts[-1]
         
-        # Get README content using GitHub API
-        readme_url = f"https://api.github.com/repos/{owner}/{repo}/readme"
-        headers = {"Authorization": f"token {GITHUB_API_KEY}"}
-        
-        response = requests.get(readme_url, headers=headers)
-        if response.status_code != 200:
-            return {"error": f"Failed to fetch repository README: {response.status_code}"}
+        # Get README content using GitHub API, shared across workers
+        readme_key = make_key("repo_readme", owner, repo)
+        readme_content = get_cache().get(readme_key)
+        if readme_content is None:
+            readme_url = f"https://api.github.com/repos/{owner}/{repo}/readme"
+            headers = {"Authorization": f"token {GITHUB_API_KEY}"}
             
-        readme_data = response.json()
-        readme_content = b64decode(readme_data['content']).decode('utf-8')
+            response = github_upstream.call(
+                lambda timeout: requests.get(readme_url, headers=headers, timeout=timeout),
+                hedge=True
+            )
+            if response.status_code != 200:
+                return {"error": f"Failed to fetch repository README: {response.status_code}"}
+                
+            readme_data = response.json()
+            readme_content = b64decode(readme_data['content']).decode('utf-8')
+            get_cache().set(readme_key, readme_content, REPO_CACHE_TTL)
             
         processed_response = process_repo_query(query, readme_content)
         return {
@@ -259,6 +380,9 @@ async def get_repo_context(query):
         return {"error": f"Repository access error: {str(e)}"}
 
 def classify_action_with_ai(query: str) -> str:
+    return classify_flight.do(("classify", query_key(query)), _classify_action, query)
+
+def _classify_action(query: str) -> str:
     prompt = f"""Classify this user query into one of the following action types:
     1. onboarding_query - For questions about company policies, procedures, or general information
     2. github_issues - For bug reports, feature requests, or any development tasks
@@ -277,14 +401,15 @@ def classify_action_with_ai(query: str) -> str:
 
     Response (just the action type):"""
 
-    response = openai.chat.completions.create(
+    response = openai_upstream.call(lambda timeout: openai.chat.completions.create(
         model="gpt-4-turbo-preview",
         messages=[
             {"role": "system", "content": "You are an action classifier. Respond ONLY with the exact action type, no explanation or additional text."},
             {"role": "user", "content": prompt}
         ],
-        temperature=0
-    )
+        temperature=0,
+        timeout=timeout
+    ))
     
     action_type = response.choices[0].message.content.strip().lower()
     valid_types = {"onboarding_query", "github_issues", "code_query", "create_image"}
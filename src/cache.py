@@ -0,0 +1,352 @@
+import hashlib
+import json
+import os
+import sqlite3
+import stat
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from src.constants import CACHE_BACKEND, CACHE_PATH, CACHE_MAX_BYTES
+from src.resilience import DeadlineExceeded, call_timeout, remaining
+from src.singleflight import SingleFlight
+
+_MISSING = object()
+
+
+def make_key(namespace: str, *parts) -> str:
+    """Build a compact, fixed-length cache key for a namespace and its parts"""
+    digest = hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(",", ":"))
+
+
+class CacheBackend(ABC):
+    """
+    Interface shared by the cache backends. Values must be plain
+    JSON-serializable data, which is also what their size is measured in;
+    `ttl` is in seconds and None means no expiry.
+    """
+
+    def __init__(self):
+        self._flight = SingleFlight()
+
+    @abstractmethod
+    def get(self, key, default=None):
+        pass
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        pass
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    def get_or_compute(self, key, compute, ttl=None):
+        """
+        Return the cached value, or run `compute()` once and cache its result.
+        Concurrent callers for the same key wait for that single computation.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return self._flight.do(key, self._compute, key, compute, ttl)
+
+    def _compute(self, key, compute, ttl):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+
+class MemoryCache(CacheBackend):
+    """Per-process LRU cache bounded by the serialized size of its values"""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[2] is not None and entry[2] <= time.time():
+                self._remove(key)
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl=None):
+        size = len(_dumps(value).encode("utf-8"))
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self.size += size
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+
+class SqliteCache(CacheBackend):
+    """
+    Cache shared by every worker process on the host, stored in a SQLite
+    database in WAL mode. Least recently used entries are evicted once the
+    total size exceeds `max_bytes`, and a lease row makes get-or-compute
+    atomic across processes, not just threads.
+
+    The database is created owner-only (0600) in a directory this user owns,
+    and values are stored as JSON, so reading an entry can never execute
+    code. Once open, read and write errors are treated as a miss and a no-op
+    so a broken cache never fails the request using it. Recency is only refreshed
+    once per `TOUCH_SECONDS` per entry, so hits are almost always read-only
+    and workers don't queue on the write lock. Waiting on the write lock or
+    on another worker's lease never outlasts the request deadline.
+    """
+
+    LEASE_SECONDS = 30
+    POLL_SECONDS = 0.05
+    TOUCH_SECONDS = 60
+    BUSY_SECONDS = 10
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        super().__init__()
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # The default lives under the shared temp directory, so refuse one
+        # that another user created (or planted as a symlink) first
+        info = os.lstat(directory)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+            raise PermissionError(f"Cache directory is not owned by this user: {directory}")
+        fd = os.open(path, os.O_CREAT | os.O_WRONLY | os.O_NOFOLLOW, 0o600)
+        try:
+            if os.fstat(fd).st_uid != os.getuid():
+                raise PermissionError(f"Cache file is not owned by this user: {path}")
+            os.fchmod(fd, 0o600)
+        finally:
+            os.close(fd)
+
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS leases (
+                key TEXT PRIMARY KEY,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    def _connect(self):
+        # Connections are per thread and are reopened after a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_SECONDS, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.busy_ms = int(self.BUSY_SECONDS * 1000)
+
+        # Don't wait on another writer's lock past the request deadline
+        busy_ms = int(call_timeout(self.BUSY_SECONDS) * 1000)
+        if busy_ms != self._local.busy_ms:
+            conn.execute(f"PRAGMA busy_timeout = {busy_ms}")
+            self._local.busy_ms = busy_ms
+        return conn
+
+    @property
+    def size(self):
+        row = self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()
+        return row[0]
+
+    def get(self, key, default=None):
+        try:
+            return self._get(key, default)
+        except sqlite3.Error as e:
+            print(f"Cache read failed, treating as a miss: {str(e)}")
+            return default
+
+    def _get(self, key, default):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires_at, accessed_at = row
+        if expires_at is not None and expires_at <= now:
+            conn.execute("DELETE FROM cache WHERE key = ? AND expires_at <= ?", (key, now))
+            return default
+        try:
+            value = json.loads(value)
+        except (TypeError, ValueError):
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return default
+        if now - accessed_at >= self.TOUCH_SECONDS:
+            conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE key = ? AND accessed_at = ?",
+                (now, key, accessed_at)
+            )
+        return value
+
+    def set(self, key, value, ttl=None):
+        data = _dumps(value)
+        size = len(data.encode("utf-8"))
+        if size > self.max_bytes:
+            self.delete(key)
+            return
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, data, size, expires_at, now)
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            print(f"Cache write failed, skipping: {str(e)}")
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+
+    def delete(self, key):
+        try:
+            self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            print(f"Cache delete failed: {str(e)}")
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM cache")
+        conn.execute("DELETE FROM leases")
+
+    def _compute(self, key, compute, ttl):
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            try:
+                if self._acquire_lease(key):
+                    break
+            except sqlite3.Error as e:
+                # Without a working lease table, compute in this worker
+                print(f"Cache lease failed, computing locally: {str(e)}")
+                value = compute()
+                self.set(key, value, ttl)
+                return value
+            # Another worker is computing this key; wait for its result, but
+            # only as long as this request's deadline allows
+            left = remaining()
+            if left is not None and left <= 0:
+                raise DeadlineExceeded("Request deadline exceeded waiting for another worker")
+            time.sleep(self.POLL_SECONDS if left is None else min(self.POLL_SECONDS, left))
+
+        try:
+            value = compute()
+            self.set(key, value, ttl)
+            return value
+        finally:
+            try:
+                self._connect().execute("DELETE FROM leases WHERE key = ?", (key,))
+            except sqlite3.Error as e:
+                # The lease expires on its own after LEASE_SECONDS
+                print(f"Cache lease release failed: {str(e)}")
+
+    def _acquire_lease(self, key):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM leases WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, expires_at) VALUES (?, ?)",
+                (key, now + self.LEASE_SECONDS)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount == 1
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> CacheBackend:
+    """Return the process-wide cache selected by CACHE_BACKEND"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if CACHE_BACKEND == "sqlite":
+                    try:
+                        _cache = SqliteCache()
+                    except (OSError, sqlite3.Error) as e:
+                        print(f"Shared cache unavailable, using a per-process cache: {str(e)}")
+                        _cache = MemoryCache()
+                elif CACHE_BACKEND == "memory":
+                    _cache = MemoryCache()
+                else:
+                    raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND}")
+    return _cache
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pydantic import BaseModel
 from typing import List
 from dotenv import load_dotenv
@@ -104,4 +105,48 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 GITHUB_API_KEY = os.getenv("GITHUB_API_KEY")
 GITHUB_API_REPO_URL = os.getenv("GITHUB_API_REPO_URL")
-GITHUB_REPO_URL = os.getenv("GITHUB_REPO_URL") 
\ No newline at end of file
+GITHUB_REPO_URL = os.getenv("GITHUB_REPO_URL")
+
+# Upstream Resilience (seconds unless noted)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "20"))
+GITHUB_TIMEOUT_SECONDS = float(os.getenv("GITHUB_TIMEOUT_SECONDS", "10"))
+PINECONE_TIMEOUT_SECONDS = float(os.getenv("PINECONE_TIMEOUT_SECONDS", "5"))
+PERMIT_TIMEOUT_SECONDS = float(os.getenv("PERMIT_TIMEOUT_SECONDS", "5"))
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "4"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+GENERATION_BUDGET_SECONDS = float(os.getenv("GENERATION_BUDGET_SECONDS", "8"))
+GENERATION_LATENCY_PERCENTILE = float(os.getenv("GENERATION_LATENCY_PERCENTILE", "90"))
+EXTRACTIVE_MAX_POINTS = int(os.getenv("EXTRACTIVE_MAX_POINTS", "8"))
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Caching (CACHE_BACKEND is "memory" per worker or "sqlite" shared per host).
+# The SQLite file defaults to a per-user, owner-only directory on local disk:
+# the app directory may be read-only or a network share (Azure's /home), where
+# WAL locking doesn't work
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(
+    tempfile.gettempdir(), f"donna-cache-{os.getuid()}", "cache.sqlite3"
+))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PERMISSION_CACHE_TTL = float(os.getenv("PERMISSION_CACHE_TTL", "60"))
+USER_SYNC_CACHE_TTL = float(os.getenv("USER_SYNC_CACHE_TTL", "3600"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "86400"))
+REPO_CACHE_TTL = float(os.getenv("REPO_CACHE_TTL", "600"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "600"))
+
+# Onboarding Retrieval
+ONBOARDING_PDF_PATH = os.getenv(
+    "ONBOARDING_PDF_PATH",
+    os.path.join(APP_ROOT, "data", "Onboarding.pdf")
+)
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "10"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "1") == "1"
+MIN_TOP_K = int(os.getenv("MIN_TOP_K", "2"))
+ADAPTIVE_SCORE_RATIO = float(os.getenv("ADAPTIVE_SCORE_RATIO", "0.7"))
+DEDUPE_OVERLAP = float(os.getenv("DEDUPE_OVERLAP", "0.6"))
+INDEX_RETRY_SECONDS = float(os.getenv("INDEX_RETRY_SECONDS", "300"))
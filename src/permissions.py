@@ -1,22 +1,43 @@
-from permit import Permit
+import threading
 from dotenv import load_dotenv
-import requests
 from src.constants import (
     PERMIT_API_URL, PERMIT_PROJECT_ID, PERMIT_ENVIRONMENT_ID,
-    PERMIT_API_KEY, PERMIT_PDP_URL, USERS, PERMISSION_TYPES
+    PERMIT_API_KEY, PERMIT_PDP_URL, USERS, PERMISSION_TYPES,
+    PERMISSION_CACHE_TTL, USER_SYNC_CACHE_TTL
 )
+from src.cache import get_cache, make_key
+from src.lazy import lazy_import
+from src.resilience import permit_upstream
 
 load_dotenv()
 
-print("Loading Permit configuration:")
-print(f"PDP URL: {PERMIT_PDP_URL}")
-print(f"API Key exists: {'Yes' if PERMIT_API_KEY else 'No'}")
+requests = lazy_import("requests")
+permit_sdk = lazy_import("permit")
 
-# Initialize Permit client
-permit = Permit(
-    token=PERMIT_API_KEY,
-    pdp=PERMIT_PDP_URL,
-)
+_permit = None
+_permit_lock = threading.Lock()
+
+def get_permit():
+    """
+    Return the shared Permit client, creating it on first use
+    """
+    global _permit
+    if _permit is None:
+        with _permit_lock:
+            if _permit is None:
+                print("Loading Permit configuration:")
+                print(f"PDP URL: {PERMIT_PDP_URL}")
+                print(f"API Key exists: {'Yes' if PERMIT_API_KEY else 'No'}")
+
+                _permit = permit_sdk.Permit(
+                    token=PERMIT_API_KEY,
+                    pdp=PERMIT_PDP_URL,
+                )
+    return _permit
+
+def permission_cache_key(user_key: str, permission_name: str) -> str:
+    permission_config = PERMISSION_TYPES[permission_name]
+    return make_key("permission", user_key, permission_config["action"], permission_config["resource"])
 
 async def sync_user(username: str):
     """
@@ -26,11 +47,16 @@ async def sync_user(username: str):
         return False, "Invalid user"
     
     user = USERS[username]
+    cache_key = make_key("permit_sync", user["key"], user["email"])
+    if get_cache().get(cache_key):
+        return True, "User synced successfully"
+    
     try:
-        await permit.api.sync_user({
+        await permit_upstream.call_async(lambda timeout: get_permit().api.sync_user({
             "key": user["key"],
             "email": user["email"]
-        })
+        }))
+        get_cache().set(cache_key, True, USER_SYNC_CACHE_TTL)
         return True, "User synced successfully"
     except Exception as e:
         return False, f"Error syncing user: {str(e)}"
@@ -48,17 +74,22 @@ async def check_permission(username: str, permission_name: str) -> tuple[bool, s
         return False, f"Unknown permission type: {permission_name}"
     
     try:
-        # First sync the user
-        sync_success, sync_message = await sync_user(username)
-        if not sync_success:
-            return False, sync_message
-            
-        # Single permission check using user key
-        allowed = await permit.check(
-            user["key"],
-            permission_config["action"],
-            permission_config["resource"]
-        )
+        # Decisions are shared by all workers until they expire or a role changes
+        cache_key = permission_cache_key(user["key"], permission_name)
+        allowed = get_cache().get(cache_key)
+        if allowed is None:
+            # First sync the user
+            sync_success, sync_message = await sync_user(username)
+            if not sync_success:
+                return False, sync_message
+                
+            # Single permission check using user key
+            allowed = bool(await permit_upstream.call_async(lambda timeout: get_permit().check(
+                user["key"],
+                permission_config["action"],
+                permission_config["resource"]
+            )))
+            get_cache().set(cache_key, allowed, PERMISSION_CACHE_TTL)
         
         reason = "Permission granted" if allowed else "You don't have permission to perform this action"
         return allowed, reason
@@ -85,7 +116,9 @@ async def get_permit_users():
             "Authorization": f"Bearer {PERMIT_API_KEY}"
         }
         
-        response = requests.get(url, headers=headers)
+        response = permit_upstream.call(
+            lambda timeout: requests.get(url, headers=headers, timeout=timeout)
+        )
         if response.status_code == 200:
             return response.json()
         else:
@@ -114,11 +147,18 @@ async def update_user_role(user_id: str, role: str, action: str = "add"):
         }
         
         if action == "add":
-            response = requests.post(url, headers=headers, json=data)
+            response = permit_upstream.call(
+                lambda timeout: requests.post(url, headers=headers, json=data, timeout=timeout)
+            )
         else:  # remove
-            response = requests.delete(url, headers=headers, json=data)
+            response = permit_upstream.call(
+                lambda timeout: requests.delete(url, headers=headers, json=data, timeout=timeout)
+            )
             
         if response.status_code in [200, 201, 204]:
+            cache = get_cache()
+            for permission_name in PERMISSION_TYPES:
+                cache.delete(permission_cache_key(user_id, permission_name))
             return {"success": True, "message": f"Role {action}ed successfully"}
         else:
             print(f"Error updating role: {response.status_code}")
@@ -0,0 +1,305 @@
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from src.constants import (
+    REQUEST_DEADLINE_SECONDS, OPENAI_TIMEOUT_SECONDS, GITHUB_TIMEOUT_SECONDS,
+    PINECONE_TIMEOUT_SECONDS, PERMIT_TIMEOUT_SECONDS, HEDGE_PERCENTILE, HEDGE_WORKERS,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS
+)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: float = REQUEST_DEADLINE_SECONDS):
+    """Bound everything run inside the block by a shared absolute deadline"""
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """Seconds left before the current request deadline, or None if unbounded"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def call_timeout(default: float) -> float:
+    """Per-call timeout clipped to whatever is left of the request deadline"""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return min(default, left)
+
+
+class LatencyTracker:
+    def __init__(self, window=200, min_samples=20):
+        self._samples = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float):
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[index]
+
+
+class CircuitBreaker:
+    """
+    Fail fast while an upstream is unhealthy.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    are rejected until `reset_timeout` has passed; then a single probe call is
+    let through, and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                 reset_timeout=CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if elapsed >= self.reset_timeout and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError(f"{self.name} is unavailable, failing fast")
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """Let another call probe after one that ended without an outcome"""
+        with self._lock:
+            self._probing = False
+
+
+def _exception_names(exc):
+    return {cls.__name__ for cls in type(exc).__mro__}
+
+
+def _status_code(obj):
+    for candidate in (obj, getattr(obj, "response", None)):
+        code = getattr(candidate, "status_code", None) or getattr(candidate, "status", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_timeout(exc) -> bool:
+    # Matched by name too, so SDK timeouts (openai, requests, httpx) count
+    # without importing those SDKs here
+    return (
+        isinstance(exc, (TimeoutError, asyncio.TimeoutError, DeadlineExceeded))
+        or any("Timeout" in name for name in _exception_names(exc))
+    )
+
+
+def is_unavailable_status(code) -> bool:
+    return code is not None and (code >= 500 or code == 429)
+
+
+def is_outage(exc) -> bool:
+    """Whether an error means the upstream is down or slow, not that the request was bad"""
+    return (
+        isinstance(exc, (CircuitOpenError, ConnectionError))
+        or is_timeout(exc)
+        or bool(_exception_names(exc) & {"ConnectionError", "APIConnectionError"})
+        or is_unavailable_status(_status_code(exc))
+    )
+
+
+class Upstream:
+    """
+    Timeout, circuit breaker and latency stats for one upstream service.
+
+    `fn` is always called with the effective timeout in seconds, so each
+    client can apply it in whatever form its SDK expects.
+    """
+
+    def __init__(self, name, timeout, hedge_percentile=HEDGE_PERCENTILE,
+                 hedge_workers=HEDGE_WORKERS):
+        self.name = name
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.breaker = CircuitBreaker(name)
+        self.latency = LatencyTracker()
+        # Each upstream hedges on its own pool, so calls abandoned during one
+        # upstream's slowdown can't starve the others
+        self.hedge_workers = hedge_workers
+        self._pool = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix=f"hedge-{name}")
+        self._busy = 0
+        self._busy_lock = threading.Lock()
+
+    def _record_error(self, exc, timeout):
+        """
+        Count only outages against the breaker. Timeouts count only when the
+        upstream had its full timeout; one clipped by an almost spent request
+        deadline, and client errors like a rejected prompt, say nothing about
+        the upstream's health.
+        """
+        if is_timeout(exc):
+            failed = timeout >= self.timeout
+        else:
+            failed = is_outage(exc)
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.release_probe()
+
+    def _record_result(self, result):
+        # HTTP clients return 5xx/429 responses instead of raising
+        if is_unavailable_status(_status_code(result)):
+            self.breaker.record_failure()
+            return False
+        self.breaker.record_success()
+        return True
+
+    def call(self, fn, hedge=False, latency=None):
+        """
+        Run `fn(timeout)`. With `hedge=True` (idempotent reads only) a
+        duplicate request is started once the first one has been outstanding
+        longer than the latency percentile, and the first to finish wins.
+        Pass a `latency` tracker per operation so one slow kind of call
+        doesn't set the hedge threshold for a fast one.
+        """
+        latency = latency or self.latency
+        timeout = call_timeout(self.timeout)
+        self.breaker.before_call()
+        start = time.monotonic()
+        try:
+            result = self._hedged(fn, timeout, latency) if hedge else fn(timeout)
+        except Exception as e:
+            self._record_error(e, timeout)
+            raise
+        except BaseException:
+            self.breaker.release_probe()
+            raise
+        if self._record_result(result):
+            latency.record(time.monotonic() - start)
+        return result
+
+    async def call_async(self, fn, latency=None):
+        """Run the awaitable returned by `fn(timeout)`, bounded by the timeout"""
+        latency = latency or self.latency
+        timeout = call_timeout(self.timeout)
+        self.breaker.before_call()
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(timeout), timeout)
+        except Exception as e:
+            self._record_error(e, timeout)
+            raise
+        except BaseException:
+            # Cancellation says nothing about the upstream's health
+            self.breaker.release_probe()
+            raise
+        if self._record_result(result):
+            latency.record(time.monotonic() - start)
+        return result
+
+    def _submit(self, fn, timeout):
+        """Start `fn` on the hedge pool, or return None if every worker is busy"""
+        with self._busy_lock:
+            if self._busy >= self.hedge_workers:
+                return None
+            self._busy += 1
+
+        def run():
+            try:
+                return fn(timeout)
+            finally:
+                with self._busy_lock:
+                    self._busy -= 1
+
+        return self._pool.submit(run)
+
+    def _hedged(self, fn, timeout, latency):
+        deadline = time.monotonic() + timeout
+        first = self._submit(fn, timeout)
+        if first is None:
+            # Saturated: run inline rather than queue behind abandoned calls
+            return fn(timeout)
+        futures = [first]
+
+        hedge_after = latency.percentile(self.hedge_percentile)
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                second = self._submit(fn, deadline - time.monotonic())
+                if second is not None:
+                    futures.append(second)
+
+        pending = set(futures)
+        error = None
+        while pending:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        if error is not None:
+            raise error
+        raise DeadlineExceeded(f"{self.name} did not respond within {timeout:.1f}s")
+
+
+openai_upstream = Upstream("openai", OPENAI_TIMEOUT_SECONDS)
+github_upstream = Upstream("github", GITHUB_TIMEOUT_SECONDS)
+pinecone_upstream = Upstream("pinecone", PINECONE_TIMEOUT_SECONDS)
+permit_upstream = Upstream("permit", PERMIT_TIMEOUT_SECONDS)
@@ -0,0 +1,214 @@
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from src.constants import (
+    ONBOARDING_PDF_PATH, RRF_K, RERANK_ENABLED, ADAPTIVE_SCORE_RATIO, MIN_TOP_K,
+    DEDUPE_OVERLAP, INDEX_RETRY_SECONDS
+)
+from src.lazy import lazy_import
+
+pypdf = lazy_import("pypdf")
+text_splitters = lazy_import("langchain_text_splitters")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it me my of on or
+our the to we what when where which who why will with you your
+""".split())
+
+# Numbered all-caps headings like "4. LEAVE POLICY" (numbered steps are mixed case)
+SECTION_HEADER = re.compile(r"^\s*(\d+)\.\s+([A-Z][A-Z0-9 &/,'()-]{2,80})$", re.MULTILINE)
+
+
+def tokenize(text: str):
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+
+
+def section_id(section: str) -> str:
+    """Section number when there is one, so '4. Leave Policy' matches '4. LEAVE POLICY'"""
+    match = re.match(r"\s*(\d+)\.", section)
+    return match.group(1) if match else section.strip().lower()
+
+
+def overlap(terms_a, terms_b) -> float:
+    """Share of the smaller chunk's terms that also appear in the other"""
+    if not terms_a or not terms_b:
+        return 0.0
+    return len(terms_a & terms_b) / min(len(terms_a), len(terms_b))
+
+
+def same_passage(a, b, threshold=DEDUPE_OVERLAP) -> bool:
+    """
+    Whether two chunks cover the same passage. The vector chunks come from
+    the external ingestion and the lexical ones from splitting the PDF here,
+    so their text rarely matches exactly; compare sections and term overlap.
+    """
+    sections = {section_id(a['section']), section_id(b['section'])}
+    if len(sections) > 1 and "general" not in sections:
+        return False
+    return overlap(a['terms'], b['terms']) >= threshold
+
+
+class BM25Index:
+    """In-memory Okapi BM25 over a fixed list of chunks, via an inverted index"""
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # term -> [(chunk id, term frequency)]
+        self.lengths = []
+
+        for chunk_id, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk['content']))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings[term].append((chunk_id, tf))
+
+        total = len(self.lengths)
+        self.avg_length = (sum(self.lengths) / total) if total else 0
+        self.idf = {
+            term: math.log(1 + (total - len(posting) + 0.5) / (len(posting) + 0.5))
+            for term, posting in self.postings.items()
+        }
+
+    def search(self, query: str, top_k=10):
+        """Return up to `top_k` (chunk, score) pairs, best first"""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for chunk_id, tf in self.postings[term]:
+                norm = 1 - self.b + self.b * self.lengths[chunk_id] / self.avg_length
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [(self.chunks[chunk_id], score) for chunk_id, score in best]
+
+
+def load_onboarding_chunks(path=ONBOARDING_PDF_PATH, chunk_size=1000, chunk_overlap=200):
+    """Split the onboarding guide into chunks tagged with their numbered section"""
+    reader = pypdf.PdfReader(path)
+    text = "\n".join(page.extract_text() or "" for page in reader.pages)
+
+    # Slice the guide at numbered headings so each chunk keeps its section
+    headers = list(SECTION_HEADER.finditer(text))
+    spans = [("General", 0, headers[0].start() if headers else len(text))]
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+        spans.append((f"{header.group(1)}. {header.group(2).strip()}", header.start(), end))
+
+    splitter = text_splitters.RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    chunks = []
+    for section, start, end in spans:
+        for piece in splitter.split_text(text[start:end]):
+            if piece.strip():
+                chunks.append({'content': piece, 'section': section})
+    return chunks
+
+
+_index = None
+_index_error = None
+_index_failed_at = 0.0
+_index_lock = threading.Lock()
+
+def get_onboarding_index():
+    """
+    Build the BM25 index over the onboarding guide once per process. A failed
+    build is remembered and re-raised for INDEX_RETRY_SECONDS before retrying.
+    """
+    global _index, _index_error, _index_failed_at
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if _index_error is not None and time.monotonic() - _index_failed_at < INDEX_RETRY_SECONDS:
+                    raise _index_error
+                try:
+                    _index = BM25Index(load_onboarding_chunks())
+                    _index_error = None
+                except Exception as e:
+                    print(f"Lexical index unavailable, using vector results only: {str(e)}")
+                    _index_error = e
+                    _index_failed_at = time.monotonic()
+                    raise
+    return _index
+
+
+def reciprocal_rank_fusion(ranked_lists, k=RRF_K):
+    """
+    Merge ranked chunk lists, scoring each chunk by sum(1 / (k + rank)).
+    Chunks that cover the same passage (see `same_passage`) are treated as
+    one, keeping the copy from the earliest list.
+    """
+    fused = []  # [chunk, score, {'section', 'terms'}]
+    for ranked in ranked_lists:
+        for rank, chunk in enumerate(ranked, start=1):
+            identity = {'section': chunk['section'], 'terms': set(tokenize(chunk['content']))}
+            entry = next((e for e in fused if same_passage(e[2], identity)), None)
+            if entry is None:
+                entry = [chunk, 0.0, identity]
+                fused.append(entry)
+            entry[1] += 1.0 / (k + rank)
+    fused.sort(key=lambda entry: entry[1], reverse=True)
+    return [(chunk, score) for chunk, score, _ in fused]
+
+
+def rerank(query, scored, idf):
+    """
+    Lightweight local reranker: blend the fused score with the idf-weighted
+    share of query terms each chunk contains, plus a bonus for every number
+    in the query (form ids, amounts, deadlines) found verbatim.
+    """
+    terms = set(tokenize(query))
+    numbers = set(re.findall(r"\d+", query))
+    total_weight = sum(idf.get(term, 1.0) for term in terms) or 1.0
+    top_fused = scored[0][1] if scored else 1.0
+
+    reranked = []
+    for chunk, fused_score in scored:
+        chunk_terms = set(tokenize(chunk['content']))
+        coverage = sum(idf.get(term, 1.0) for term in terms & chunk_terms) / total_weight
+        number_hits = len(numbers & chunk_terms) / len(numbers) if numbers else 0.0
+        score = 0.5 * fused_score / top_fused + 0.4 * coverage + 0.1 * number_hits
+        reranked.append((chunk, score))
+    return sorted(reranked, key=lambda entry: entry[1], reverse=True)
+
+
+def adaptive_cutoff(scored, max_k, min_k=MIN_TOP_K, ratio=ADAPTIVE_SCORE_RATIO):
+    """Keep the leading chunks whose score stays within `ratio` of the best one"""
+    if not scored:
+        return []
+    floor = scored[0][1] * ratio
+    kept = scored[:min(min_k, max_k)]
+    for chunk, score in scored[min_k:max_k]:
+        if score < floor:
+            break
+        kept.append((chunk, score))
+    return kept
+
+
+def hybrid_search(query, vector_results, max_k=5, candidates=10, rerank_enabled=RERANK_ENABLED):
+    """
+    Combine dense `vector_results` (best first) with BM25 over the onboarding
+    guide using reciprocal-rank fusion, optionally rerank, and trim to an
+    adaptive top-k. Falls back to the vector results alone if the lexical
+    index can't be built.
+    """
+    try:
+        index = get_onboarding_index()
+    except Exception:
+        return vector_results[:max_k]
+
+    lexical_results = [chunk for chunk, _ in index.search(query, candidates)]
+    scored = reciprocal_rank_fusion([vector_results, lexical_results])
+    if rerank_enabled:
+        scored = rerank(query, scored, index.idf)
+
+    return [
+        {**chunk, 'relevance_score': round(score, 4)}
+        for chunk, score in adaptive_cutoff(scored, max_k)
+    ]
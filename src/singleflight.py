@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from src.resilience import DeadlineExceeded, remaining
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into a single in-flight computation.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is still running (followers) wait and receive the leader's
+    result, or re-raise the leader's exception. Nothing is cached once the
+    call completes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _join(self, key):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            return call, True
+
+    def _finish(self, key, call, result=None, error=None):
+        call.result = result
+        call.error = error
+        with self._lock:
+            self._calls.pop(key, None)
+        call.done.set()
+
+    @staticmethod
+    def _wait_timeout():
+        # Followers give up at their own request deadline, not the leader's
+        left = remaining()
+        return None if left is None else max(left, 0)
+
+    @staticmethod
+    def _outcome(call, finished):
+        if not finished:
+            raise DeadlineExceeded("Request deadline exceeded waiting for an identical request")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key, fn, *args, **kwargs):
+        call, leader = self._join(key)
+        if not leader:
+            finished = call.done.wait(self._wait_timeout())
+            return self._outcome(call, finished)
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        # Every Flask request runs on its own event loop, so followers wait on
+        # the thread event off-loop instead of sharing an asyncio future.
+        call, leader = self._join(key)
+        if not leader:
+            finished = await asyncio.to_thread(call.done.wait, self._wait_timeout())
+            return self._outcome(call, finished)
+
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, call, error=e)
+            raise
+        self._finish(key, call, result=result)
+        return result
+
+
+def query_key(query: str) -> str:
+    """Normalize a query so trivially different spellings share a flight"""
+    return " ".join(query.split())
@@ -8,5 +8,10 @@ if ! command -v git &> /dev/null; then
 fi
 
 # Start the application
+# PRELOAD_APP=1 imports and warms the app once before forking the workers
 cd %HOME%\site\wwwroot\server
-gunicorn app:app --bind=0.0.0.0:$PORT 
\ No newline at end of file
+if [ "$PRELOAD_APP" = "1" ]; then
+    gunicorn app:app --bind=0.0.0.0:$PORT --preload
+else
+    gunicorn app:app --bind=0.0.0.0:$PORT
+fi
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from src import agent, agent_functions, retrieval
+from src.cache import MemoryCache
+from src.resilience import CircuitBreaker, CircuitOpenError
+
+CHUNKS = [
+    {'content': "Full-time employees accrue 10 days of PTO annually.", 'section': "4. LEAVE POLICY"},
+    {'content': "Laptops must be locked when unattended.", 'section': "5. IT POLICY"},
+]
+
+
+@pytest.fixture
+def openai_down(monkeypatch):
+    breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    monkeypatch.setattr(agent_functions.openai_upstream, "breaker", breaker)
+    monkeypatch.setattr(agent_functions, "initialize_clients", lambda: (None, None))
+    monkeypatch.setattr(agent_functions, "get_cache", lambda: MemoryCache())
+    monkeypatch.setattr(retrieval, "get_onboarding_index", lambda: retrieval.BM25Index(CHUNKS))
+
+
+def test_unavailable_model_falls_back_to_lexical_extractive_answer(openai_down):
+    result = agent_functions.fetch_onboarding_data(
+        "How many PTO days?", fallback=agent.extractive_onboarding_answer
+    )
+
+    assert 'error' not in result
+    assert result['extractive'] is True
+    assert "10 days of PTO" in result['response']
+
+
+def test_unavailable_model_without_fallback_reports_an_error(openai_down):
+    result = agent_functions.fetch_onboarding_data("How many PTO days?")
+
+    assert result['error'] == 'Failed to fetch onboarding information'
+
+
+def test_classification_failure_defaults_to_onboarding(monkeypatch):
+    def classify(query):
+        raise CircuitOpenError("openai is unavailable, failing fast")
+
+    async def allow(user_id, action_type):
+        return True, "Permission granted"
+
+    monkeypatch.setattr(agent, "classify_action_with_ai", classify)
+    monkeypatch.setattr(agent, "check_action_permission", allow)
+    monkeypatch.setattr(agent, "fetch_onboarding_data", lambda query, fallback=None: {
+        'response': "answer", 'extractive': True
+    })
+
+    result = asyncio.run(agent.process_query("admin", "How many PTO days?"))
+
+    assert result['status'] == "success"
+    assert result['action_type'] == "onboarding_query"
+    assert result['extractive'] is True
+
+
+def test_classification_client_error_is_reported(monkeypatch):
+    class AuthenticationError(Exception):
+        status_code = 401
+
+    def classify(query):
+        raise AuthenticationError("invalid api key")
+
+    monkeypatch.setattr(agent, "classify_action_with_ai", classify)
+
+    result = asyncio.run(agent.process_query("admin", "How many PTO days?"))
+
+    assert result == {"status": "error", "message": "invalid api key"}
+
+
+def test_extractive_answer_keeps_general_chunks_out_of_earlier_sections():
+    results = [
+        {'content': "Lock your laptop.\nRotate passwords every 90 days.\nReport lost devices.",
+         'section': "5. IT POLICY"},
+        {'content': "Employees accrue 10 days of PTO.", 'section': "General"},
+        {'content': "Enroll within 30 days.\nPick a plan.\nAdd dependents.",
+         'section': "6. BENEFITS"},
+    ]
+
+    response = agent.extractive_onboarding_answer("What should I know?", results)
+
+    it_section = response.split("## IT POLICY")[1].split("##")[0]
+    assert "Employees accrue 10 days of PTO." not in it_section
+    assert "• Employees accrue 10 days of PTO." in response.split("## IT POLICY")[0]
+    assert "Enroll within 30 days." in response.split("## BENEFITS")[1]
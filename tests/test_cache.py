@@ -0,0 +1,156 @@
+import os
+import sqlite3
+import stat
+import threading
+import time
+
+import pytest
+
+from src import cache as cache_module
+from src.cache import CacheBackend, MemoryCache, SqliteCache, make_key
+from src.resilience import DeadlineExceeded, request_deadline
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCache(max_bytes=200)
+    return SqliteCache(str(tmp_path / "instance" / "cache.sqlite3"), max_bytes=200)
+
+
+def test_round_trips_plain_data(cache):
+    value = {'response': "answer", 'extractive': False, 'scores': [0.5, 0.25]}
+    cache.set("key", value)
+    assert cache.get("key") == value
+    assert cache.get("missing", "default") == "default"
+
+
+def test_entries_expire(cache):
+    cache.set("key", True, ttl=0.05)
+    assert cache.get("key") is True
+    time.sleep(0.1)
+    assert cache.get("key") is None
+
+
+def test_evicts_least_recently_used_beyond_max_bytes(cache):
+    for i in range(10):
+        cache.set(f"k{i}", "x" * 30)
+    assert cache.size <= 200
+    assert cache.get("k0") is None
+    assert cache.get("k9") == "x" * 30
+
+
+def test_rejects_values_that_are_not_plain_data(cache):
+    with pytest.raises(TypeError):
+        cache.set("key", object())
+
+
+def test_get_or_compute_runs_once(cache):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "value"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ["value"] * 5
+
+
+def test_sqlite_file_is_owner_only(tmp_path):
+    path = tmp_path / "instance" / "cache.sqlite3"
+    SqliteCache(str(path))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_sqlite_hits_only_touch_stale_entries(tmp_path):
+    cache = SqliteCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("key", "value")
+    conn = cache._connect()
+    before = conn.execute("SELECT accessed_at FROM cache WHERE key = 'key'").fetchone()[0]
+
+    cache.get("key")
+    assert conn.execute("SELECT accessed_at FROM cache WHERE key = 'key'").fetchone()[0] == before
+
+    conn.execute("UPDATE cache SET accessed_at = accessed_at - ?", (SqliteCache.TOUCH_SECONDS,))
+    cache.get("key")
+    assert conn.execute("SELECT accessed_at FROM cache WHERE key = 'key'").fetchone()[0] > before
+
+
+def test_waiting_on_another_workers_lease_stops_at_the_deadline(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    leader, follower = SqliteCache(path), SqliteCache(path)
+    assert leader._acquire_lease("key")
+
+    start = time.monotonic()
+    with request_deadline(0.1):
+        with pytest.raises(DeadlineExceeded):
+            follower.get_or_compute("key", lambda: "value")
+    assert time.monotonic() - start < 0.5
+
+
+def test_write_lock_wait_stops_at_the_deadline(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SqliteCache(path)
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+
+    start = time.monotonic()
+    try:
+        with request_deadline(0.1):
+            cache.set("key", "value")
+    finally:
+        writer.execute("ROLLBACK")
+    assert time.monotonic() - start < 1
+    assert cache.get("key") is None
+
+
+def test_sqlite_errors_are_a_miss_and_a_no_op(tmp_path):
+    cache = SqliteCache(str(tmp_path / "cache.sqlite3"))
+    cache._connect().execute("DROP TABLE cache")
+
+    cache.set("key", "value")
+    assert cache.get("key", "default") == "default"
+    assert cache.get_or_compute("key", lambda: "value") == "value"
+
+
+def test_sqlite_refuses_a_directory_owned_by_someone_else(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "getuid", lambda: os.stat(tmp_path).st_uid + 1)
+    with pytest.raises(PermissionError):
+        SqliteCache(str(tmp_path / "cache.sqlite3"))
+
+
+def test_unusable_cache_path_falls_back_to_memory(tmp_path, monkeypatch):
+    not_a_directory = tmp_path / "file"
+    not_a_directory.write_text("")
+    monkeypatch.setattr(cache_module, "_cache", None)
+    monkeypatch.setattr(cache_module, "CACHE_BACKEND", "sqlite")
+    monkeypatch.setattr(
+        cache_module, "SqliteCache", lambda: SqliteCache(str(not_a_directory / "cache.sqlite3"))
+    )
+
+    assert isinstance(cache_module.get_cache(), MemoryCache)
+
+
+def test_incomplete_backend_fails_at_construction():
+    class GetOnly(CacheBackend):
+        def get(self, key, default=None):
+            return default
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def test_make_key_is_namespaced_and_stable():
+    assert make_key("permission", "Admin", "read") == make_key("permission", "Admin", "read")
+    assert make_key("permission", "Admin", "read").startswith("permission:")
@@ -0,0 +1,206 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.resilience import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, LatencyTracker, Upstream,
+    is_outage, request_deadline
+)
+
+
+def fail(timeout):
+    raise ConnectionError("upstream down")
+
+
+def open_breaker(upstream, failures):
+    for _ in range(failures):
+        with pytest.raises(ConnectionError):
+            upstream.call(fail)
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("x", failure_threshold=2, reset_timeout=60)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker("x", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker("x", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.state == "half-open"
+
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_failed_probe_reopens_and_successful_probe_closes():
+    breaker = CircuitBreaker("x", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.02)
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_expired_deadline_does_not_leak_the_probe():
+    upstream = Upstream("x", timeout=1.0)
+    upstream.breaker = CircuitBreaker("x", failure_threshold=1, reset_timeout=0.01)
+    open_breaker(upstream, 1)
+    time.sleep(0.02)
+
+    with request_deadline(0):
+        with pytest.raises(DeadlineExceeded):
+            upstream.call(lambda timeout: "ok")
+
+    assert upstream.call(lambda timeout: "ok") == "ok"
+    assert upstream.breaker.state == "closed"
+
+
+def test_cancelled_async_probe_is_released():
+    upstream = Upstream("x", timeout=1.0)
+    upstream.breaker = CircuitBreaker("x", failure_threshold=1, reset_timeout=0.01)
+    open_breaker(upstream, 1)
+    time.sleep(0.02)
+
+    async def cancelled_probe():
+        task = asyncio.ensure_future(upstream.call_async(lambda timeout: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancelled_probe())
+
+    result = asyncio.run(upstream.call_async(lambda timeout: asyncio.sleep(0, result="ok")))
+    assert result == "ok"
+    assert upstream.breaker.state == "closed"
+
+
+def test_hedge_uses_the_per_operation_tracker():
+    upstream = Upstream("x", timeout=2.0)
+    slow = LatencyTracker(min_samples=1)
+    fast = LatencyTracker(min_samples=1)
+    slow.record(3.0)
+    fast.record(0.01)
+    calls = []
+
+    def first_call_hangs(timeout):
+        calls.append(1)
+        time.sleep(1.0 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    start = time.monotonic()
+    assert upstream.call(first_call_hangs, hedge=True, latency=fast) == 2
+    assert time.monotonic() - start < 0.5
+
+
+def test_hedged_call_is_bounded_by_the_timeout():
+    upstream = Upstream("x", timeout=0.05)
+    with pytest.raises(DeadlineExceeded):
+        upstream.call(lambda timeout: time.sleep(0.5), hedge=True)
+
+
+class BadRequestError(Exception):
+    status_code = 400
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class APITimeoutError(Exception):
+    pass
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def raising(exc):
+    def fn(timeout):
+        raise exc
+    return fn
+
+
+def strict_upstream(timeout=1.0):
+    upstream = Upstream("x", timeout=timeout)
+    upstream.breaker = CircuitBreaker("x", failure_threshold=1, reset_timeout=60)
+    return upstream
+
+
+def test_client_errors_do_not_open_the_breaker():
+    upstream = strict_upstream()
+    for _ in range(3):
+        with pytest.raises(BadRequestError):
+            upstream.call(raising(BadRequestError()))
+    assert upstream.breaker.state == "closed"
+
+
+@pytest.mark.parametrize("exc", [RateLimitError(), APITimeoutError(), ConnectionError()])
+def test_outages_open_the_breaker(exc):
+    upstream = strict_upstream()
+    with pytest.raises(type(exc)):
+        upstream.call(raising(exc))
+    assert upstream.breaker.state == "open"
+
+
+def test_unavailable_responses_open_the_breaker():
+    upstream = strict_upstream()
+    assert upstream.call(lambda timeout: Response(503)).status_code == 503
+    assert upstream.breaker.state == "open"
+
+
+def test_timeouts_clipped_by_the_request_deadline_do_not_count():
+    upstream = strict_upstream(timeout=10.0)
+    with request_deadline(1.0):
+        with pytest.raises(APITimeoutError):
+            upstream.call(raising(APITimeoutError()))
+    assert upstream.breaker.state == "closed"
+
+
+def test_saturated_hedge_pool_runs_inline_without_touching_other_upstreams():
+    busy = Upstream("busy", timeout=2.0, hedge_workers=1)
+    other = Upstream("other", timeout=2.0, hedge_workers=1)
+    release = threading.Event()
+    hung = threading.Thread(target=lambda: busy.call(lambda timeout: release.wait(), hedge=True))
+    hung.start()
+    time.sleep(0.05)
+
+    try:
+        caller = threading.current_thread()
+        assert busy.call(lambda timeout: threading.current_thread() is caller, hedge=True)
+        assert other.call(lambda timeout: threading.current_thread() is not caller, hedge=True)
+    finally:
+        release.set()
+        hung.join()
+
+
+def test_is_outage_distinguishes_outages_from_bad_requests():
+    assert is_outage(CircuitOpenError())
+    assert is_outage(DeadlineExceeded())
+    assert is_outage(APITimeoutError())
+    assert not is_outage(BadRequestError())
+    assert not is_outage(ValueError("missing api key"))
@@ -0,0 +1,66 @@
+import pytest
+
+from src import retrieval
+from src.retrieval import BM25Index, adaptive_cutoff, reciprocal_rank_fusion
+
+LEAVE = "Full-time employees accrue 10 days of PTO annually. After 2 years: 15 days"
+IT = "Laptops must be locked when unattended and passwords rotated every 90 days."
+
+
+def chunk(content, section):
+    return {'content': content, 'section': section}
+
+
+def test_bm25_ranks_exact_term_matches_first():
+    index = BM25Index([chunk(IT, "5. IT POLICY"), chunk(LEAVE, "4. LEAVE POLICY")])
+    results = index.search("How many PTO days?", top_k=2)
+    assert results[0][0]['section'] == "4. LEAVE POLICY"
+
+
+def test_fusion_merges_near_duplicate_passages_across_chunkers():
+    vector = [chunk(LEAVE + ".", "4. Leave Policy"), chunk(IT, "5. IT Policy")]
+    lexical = [chunk("4. LEAVE POLICY\n" + LEAVE, "4. LEAVE POLICY")]
+
+    fused = reciprocal_rank_fusion([vector, lexical])
+
+    assert len(fused) == 2
+    top, score = fused[0]
+    assert top['content'] == LEAVE + "."
+    assert score == pytest.approx(2 / 61)
+
+
+def test_fusion_keeps_similar_text_from_different_sections_apart():
+    fused = reciprocal_rank_fusion([
+        [chunk(LEAVE, "4. LEAVE POLICY")],
+        [chunk(LEAVE, "10. BENEFITS OVERVIEW")],
+    ])
+    assert len(fused) == 2
+
+
+def test_adaptive_cutoff_trims_low_scores_within_bounds():
+    scored = [(chunk(str(i), "General"), score) for i, score in enumerate([1.0, 0.9, 0.8, 0.3, 0.2])]
+    assert len(adaptive_cutoff(scored, max_k=5, min_k=2, ratio=0.7)) == 3
+    assert len(adaptive_cutoff(scored, max_k=1, min_k=2, ratio=0.7)) == 1
+
+
+def test_failed_index_build_is_not_retried_during_back_off(monkeypatch):
+    calls = []
+
+    def missing_pdf():
+        calls.append(1)
+        raise FileNotFoundError("Onboarding.pdf")
+
+    monkeypatch.setattr(retrieval, "_index", None)
+    monkeypatch.setattr(retrieval, "_index_error", None)
+    monkeypatch.setattr(retrieval, "load_onboarding_chunks", missing_pdf)
+
+    vector = [chunk(LEAVE, "4. LEAVE POLICY")]
+    for _ in range(3):
+        assert retrieval.hybrid_search("PTO days", vector) == vector
+
+    assert calls == [1]
+
+    monkeypatch.setattr(retrieval, "INDEX_RETRY_SECONDS", 0)
+    with pytest.raises(FileNotFoundError):
+        retrieval.get_onboarding_index()
+    assert calls == [1, 1]
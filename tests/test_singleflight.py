@@ -0,0 +1,71 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.resilience import DeadlineExceeded, request_deadline
+from src.singleflight import SingleFlight, query_key
+
+
+def run_concurrently(target, count):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "answer"
+
+    run_concurrently(lambda: results.append(flight.do("key", compute)), 8)
+
+    assert len(calls) == 1
+    assert results == ["answer"] * 8
+
+
+def test_followers_receive_the_leaders_error():
+    flight = SingleFlight()
+    errors = []
+
+    async def compute():
+        await asyncio.sleep(0.1)
+        raise ValueError("boom")
+
+    def run():
+        try:
+            asyncio.run(flight.do_async("key", compute))
+        except ValueError as e:
+            errors.append(str(e))
+
+    run_concurrently(run, 4)
+
+    assert errors == ["boom"] * 4
+
+
+def test_follower_wait_is_bounded_by_its_own_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: flight.do("key", release.wait))
+    leader.start()
+    time.sleep(0.02)
+
+    try:
+        with request_deadline(0.05):
+            with pytest.raises(DeadlineExceeded):
+                flight.do("key", lambda: "unused")
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_query_key_normalizes_whitespace():
+    assert query_key("  how   many\tdays? ") == "how many days?"